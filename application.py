@@ -3,12 +3,12 @@
 Template for SNAP Dash apps.
 """
 import os
-from datetime import datetime
-import plotly.graph_objs as go
 import dash
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 import luts
 import data
+import figures
 from gui import layout
 
 app = dash.Dash(__name__)
@@ -76,206 +76,82 @@ app.title = luts.title
 app.layout = layout
 
 
-def get_title_date_span(day_range):
-    """Helper to build the string fragment stating time span in titles."""
-    return str(
-        datetime.strptime(str(day_range[0]), "%j").strftime("%B %-d")
-        + "—"
-        + datetime.strptime(str(day_range[1]), "%j").strftime("%B %-d")
-    )
-
-
-# Some reused configs in charts go here to reduce duplication.
-yaxis_conf = dict(
-    title="Area burned (acres)",
-    fixedrange=True,
-)
-xaxis_conf = dict(
-    tickformat="%B %-d",
-    fixedrange=True,
+@app.callback(
+    [Output("tally-version", "data"), Output("tally_zone-version", "data")],
+    [Input("data-poll", "n_intervals")],
+    [State("tally-version", "data"), State("tally_zone-version", "data")],
+    prevent_initial_call=True,
 )
-hover_conf = "%{y:,} acres"  # hover format (D3 language)
+def poll_data_versions(n_intervals, tally_version, tally_zone_version):
+    """
+    Check whether the upstream data has changed since the page
+    loaded.  Only the versions of sources that changed are sent
+    back, so only the charts drawn from them redraw.
+    """
+    versions = data.get_source_versions()
+    updates = [
+        version if version not in (None, current) else dash.no_update
+        for (version, current) in [
+            (versions.get("tally"), tally_version),
+            (versions.get("tally_zone"), tally_zone_version),
+        ]
+    ]
+    if all(update is dash.no_update for update in updates):
+        raise PreventUpdate
+    return updates
 
 
-@app.callback(Output("tally", "figure"), [Input("day_range", "value")])
-def update_tally(day_range):
+@app.callback(
+    Output("tally", "figure"),
+    [
+        Input("day_range", "value"),
+        Input("as_of", "date"),
+        Input("tally-version", "data"),
+    ],
+    prevent_initial_call=True,
+)
+def update_tally(day_range, as_of, _tally_version):
     """Generate daily tally count"""
-
-    (tally, tally_zone, tally_zone_date_ranges) = data.fetch_data()
-    data_traces = []
-
-    #  Slice by day range.
-    sliced = tally.loc[(tally.doy >= day_range[0]) & (tally.doy <= day_range[1])]
-
-    grouped = sliced.groupby("FireSeason")
-    for name, group in grouped:
-        group = group.sort_values(["date_stacked"])
-
-        if name in luts.important_years:
-            hovertemplate = hover_conf
-            hoverinfo = ""
-            showlegend = True
-        else:
-            hovertemplate = None
-            hoverinfo = "skip"
-            showlegend = False
-
-        data_traces.extend(
-            [
-                {
-                    "x": group.date_stacked,
-                    "y": round(group.TotalAcres),
-                    "mode": "lines",
-                    "name": str(name),
-                    "line": {
-                        "color": luts.years_lines_styles[str(name)]["color"],
-                        "width": luts.years_lines_styles[str(name)]["width"],
-                    },
-                    "showlegend": showlegend,
-                    "hoverinfo": hoverinfo,
-                    "hovertemplate": hovertemplate,
-                }
-            ]
-        )
-
-    # Add dummy trace with legend entry for non-big years
-    data_traces.extend(
-        [
-            go.Scatter(
-                x=[None],
-                y=[None],
-                mode="lines",
-                name="Other years",
-                line={
-                    "color": luts.default_style["color"],
-                    "width": luts.default_style["width"],
-                },
-            )
-        ]
-    )
-
-    graph_layout = go.Layout(
-        title="<b>Alaska Statewide Daily Tally Records, 2004-Present,</b><br>"
-        + get_title_date_span(day_range),
-        xaxis=xaxis_conf,
-        yaxis=yaxis_conf,
-        hovermode="x unified",
-        hoverdistance=1,
-    )
-    return {"data": data_traces, "layout": graph_layout}
+    tally = data.fetch_source("tally", as_of)
+    if tally is None:
+        raise PreventUpdate
+    return figures.get_tally_figure(tally, day_range)
 
 
 @app.callback(
     Output("tally-zone", "figure"),
-    [Input("area", "value"), Input("day_range_zone", "value")],
+    [
+        Input("area", "value"),
+        Input("day_range_zone", "value"),
+        Input("as_of", "date"),
+        Input("tally_zone-version", "data"),
+    ],
+    prevent_initial_call=True,
 )
-def update_tally_zone(area, day_range):
+def update_tally_zone(area, day_range, as_of, _tally_zone_version):
     """Generate daily tally count for specified protection area"""
-    (tally, tally_zone, tally_zone_date_ranges) = data.fetch_data()
-
-    #  Slice by day range.
-    sliced = tally_zone.loc[
-        (tally_zone.doy >= day_range[0]) & (tally_zone.doy <= day_range[1])
-    ]
-
-    # Spatial clip
-    de = sliced.loc[(sliced["ProtectionUnit"] == area)]
-
-    data_traces = []
-    grouped = de.groupby("FireSeason")
-    for name, group in grouped:
-        group = group.sort_values(["date_stacked"])
-        group["TotalAcres"] = group["TotalAcres"].round(2)
-        data_traces.extend(
-            [
-                {
-                    "x": group.date_stacked,
-                    "y": round(group.TotalAcres),
-                    "mode": "lines",
-                    "name": name,
-                    "line": {
-                        "color": luts.years_lines_styles[str(name)]["color"],
-                        "width": luts.years_lines_styles[str(name)]["width"],
-                    },
-                    "hovertemplate": hover_conf,
-                }
-            ]
-        )
-
-    # Add dummy trace with legend entry for non-big years
-    data_traces.extend(
-        [
-            go.Scatter(
-                x=[None],
-                y=[None],
-                mode="lines",
-                name="Other years",
-                line={
-                    "color": luts.default_style["color"],
-                    "width": luts.default_style["width"],
-                },
-            )
-        ]
-    )
-
-    graph_layout = go.Layout(
-        title="<b>Alaska Daily Tally Records, "
-        + luts.zones[area]
-        + ", 2004-Present</b><br>"
-        + get_title_date_span(day_range),
-        xaxis=xaxis_conf,
-        yaxis=yaxis_conf,
-        hovermode="x unified",
-        hoverdistance=1,
-    )
-    return {"data": data_traces, "layout": graph_layout}
+    tally_zone = data.fetch_source("tally_zone", as_of)
+    if tally_zone is None:
+        raise PreventUpdate
+    return figures.get_tally_zone_figure(tally_zone, area, day_range)
 
 
 @app.callback(
     Output("tally-year", "figure"),
-    [Input("year", "value"), Input("day_range_year", "value")],
+    [
+        Input("year", "value"),
+        Input("day_range_year", "value"),
+        Input("as_of", "date"),
+        Input("tally_zone-version", "data"),
+    ],
+    prevent_initial_call=True,
 )
-def update_year_zone(year, day_range):
+def update_year_zone(year, day_range, as_of, _tally_zone_version):
     """Generate daily tally count by area/year"""
-    (tally, tally_zone, tally_zone_date_ranges) = data.fetch_data()
-
-    # Clip to day range
-    sliced = tally_zone.loc[
-        (tally_zone.doy >= day_range[0]) & (tally_zone.doy <= day_range[1])
-    ]
-
-    # Subset by selected year.
-    de = sliced.loc[(sliced.FireSeason == year)]
-
-    data_traces = []
-    grouped = de.groupby("ProtectionUnit")
-    for name, group in grouped:
-        group = group.sort_values(["date_stacked"])
-        group["TotalAcres"] = group["TotalAcres"].round(2)
-        data_traces.extend(
-            [
-                {
-                    "x": group.date_stacked,
-                    "y": round(group.TotalAcres),
-                    "mode": "lines",
-                    "name": luts.zones[name],
-                    "line": {"width": 2},
-                    "hovertemplate": hover_conf,
-                }
-            ]
-        )
-
-    graph_layout = go.Layout(
-        title="<b>Alaska Daily Tally Records by Year, "
-        + str(year)
-        + "</b><br>"
-        + get_title_date_span(day_range),
-        xaxis=xaxis_conf,
-        yaxis=yaxis_conf,
-        hovermode="x unified",
-        hoverdistance=1,
-    )
-    return {"data": data_traces, "layout": graph_layout}
+    tally_zone = data.fetch_source("tally_zone", as_of)
+    if tally_zone is None:
+        raise PreventUpdate
+    return figures.get_year_zone_figure(tally_zone, year, day_range)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+# pylint: disable=C0103,C0301,E0401
+"""
+Optional async serving mode, for an ASGI server:
+
+    uvicorn asgi:app --port 8080
+
+Dash callbacks run in a bounded thread pool, and upstream data is
+refreshed in the background with an async HTTP client on each source's
+schedule, with CSV parsing/preprocessing in a separate bounded executor.
+Callbacks keep being served from the current data while a refresh is
+in progress instead of queueing behind it.
+
+Needs uvicorn, a2wsgi and httpx, which the WSGI deployment doesn't.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from a2wsgi import WSGIMiddleware
+import data
+from application import application
+
+# Threads serving Dash requests (callbacks, layout, assets).
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", default="8"))
+# Threads for CSV parsing/preprocessing during background refreshes.
+ASGI_PREPROCESS_THREADS = int(os.getenv("ASGI_PREPROCESS_THREADS", default="2"))
+
+wsgi_app = WSGIMiddleware(application, workers=ASGI_THREADS)
+preprocess_executor = ThreadPoolExecutor(
+    max_workers=ASGI_PREPROCESS_THREADS, thread_name_prefix="preprocess"
+)
+
+
+async def refresh_source(client, name):
+    """
+    Download one source without blocking, load it in the preprocessing
+    executor and replace its cache entry.  Returns seconds until the
+    next refresh.
+    """
+    source = data.sources[name]
+    logging.info("Updating %s from upstream API (async)...", name)
+    started = time.monotonic()
+    try:
+        response = await client.get(source["url"])
+        response.raise_for_status()
+        df = await asyncio.get_running_loop().run_in_executor(
+            preprocess_executor, data.load_source, name, response.text, started
+        )
+    # Recommended exception handling for httpx
+    except httpx.HTTPStatusError as http_err:
+        logging.error(f"HTTP Error fetching {name}: {http_err}")
+    except httpx.RequestError as req_err:
+        logging.error(f"Request Error fetching {name}: {req_err}")
+    except Exception:
+        logging.error(traceback.format_exc())
+    else:
+        data.source_caches[name].put(name, df)
+        return source["expire"]
+    return data.RETRY_AFTER
+
+
+async def refresh_loop(client, name):
+    """Keep one source fresh, on its own schedule."""
+    while True:
+        await asyncio.sleep(await refresh_source(client, name))
+
+
+async def lifespan(receive, send):
+    """Start background refreshes on startup, stop them on shutdown."""
+    tasks = []
+    client = None
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # The background refresh owns each source's schedule from here
+            # on.  Without lifespan events (e.g. --lifespan off) this never
+            # runs, and the caches keep expiring as in the WSGI deployment.
+            data.disable_expiry()
+            client = httpx.AsyncClient(headers=data.headers, timeout=10)
+            tasks = [
+                asyncio.create_task(refresh_loop(client, name))
+                for name in data.sources
+            ]
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if client is not None:
+                await client.aclose()
+            preprocess_executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI entry point."""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
@@ -0,0 +1,105 @@
+# pylint: disable=C0103,C0301
+"""
+Import-time benchmark for the app.
+
+Runs `python -X importtime -c "import application"` in a fresh
+interpreter, parses the report Python writes to stderr and compares
+the cumulative import time of `application` against a budget.
+Exits non-zero when the budget is exceeded, so it can be used as
+a check for import-time regressions.
+
+    python bench/import_time.py
+    python bench/import_time.py --budget-ms 1500 --top 20
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+# Budget for `import application`, in milliseconds.
+IMPORT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", default="1000"))
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(report):
+    """
+    Parse `-X importtime` output into a list of
+    (module, self_us, cumulative_us, depth) tuples.
+    Lines look like this:
+    import time:       123 |        456 |   some.module
+    """
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return rows
+
+
+def measure(module="application"):
+    """Import `module` in a fresh interpreter and return the parsed report."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=repo_root,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr}")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    """Measure, report the slowest modules and check the budget."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--module", default="application")
+    parser.add_argument("--budget-ms", type=int, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # Warm-up run so .pyc compilation isn't counted.
+    measure(args.module)
+    rows = measure(args.module)
+
+    # The report is in post-order: a module's own imports are listed
+    # just before it, one indentation level deeper.
+    target = next(
+        (
+            index
+            for index, (name, _, _, depth) in enumerate(rows)
+            if name == args.module and depth == 0
+        ),
+        None,
+    )
+    if target is None:
+        sys.exit(f"{args.module} not found in -X importtime output")
+    total_us = rows[target][2]
+
+    children = []
+    for row in reversed(rows[:target]):
+        if row[3] == 0:
+            break
+        if row[3] == 1:
+            children.append(row)
+
+    print(f"Slowest direct imports of {args.module}:")
+    top_level = sorted(children, key=lambda row: row[2], reverse=True)
+    for name, _, cumulative, _ in top_level[: args.top]:
+        print(f"  {cumulative / 1000:9.1f} ms  {name}")
+
+    total_ms = total_us / 1000
+    print(f"import {args.module}: {total_ms:.1f} ms (budget {args.budget_ms} ms)")
+    if total_ms > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# pylint: disable=C0103,C0301
+"""
+Concurrent-request throughput, WSGI (gunicorn) vs. ASGI (uvicorn + asgi.py).
+
+Serves the test CSVs from a local upstream that answers slowly, with a
+short cache expiry so data refreshes happen during the run, then hits
+the statewide chart callback from many threads and reports requests/s
+and latency for each serving mode.
+
+    python bench/throughput.py --concurrency 16 --duration 20
+
+Needs gunicorn, uvicorn, a2wsgi and httpx installed.
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import subprocess
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Request body for the statewide chart callback.
+callback_body = {
+    "output": "tally.figure",
+    "outputs": {"id": "tally", "property": "figure"},
+    "inputs": [
+        {"id": "day_range", "property": "value", "value": [91, 260]},
+        {"id": "as_of", "property": "date", "value": None},
+        {"id": "tally-version", "property": "data", "value": None},
+    ],
+    "changedPropIds": ["day_range.value"],
+    "state": [],
+}
+
+
+def free_port():
+    """Find an unused local port."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_upstream(delay):
+    """
+    Serve data/*.csv on a local port, sleeping `delay`
+    seconds per request to stand in for a slow AICC server.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        """Serves the test CSVs slowly."""
+
+        def do_GET(self):  # pylint: disable=C0116
+            path = os.path.join(repo_root, "data", os.path.basename(self.path))
+            if not os.path.isfile(path):
+                self.send_error(404)
+                return
+            time.sleep(delay)
+            with open(path, "rb") as f:
+                body = f.read().removeprefix(b"\xef\xbb\xbf")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):  # pylint: disable=W0221
+            pass
+
+    class Server(ThreadingMixIn, HTTPServer):
+        """Threaded so concurrent fetches don't queue."""
+
+        daemon_threads = True
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def server_command(mode, port, threads):
+    """Command line to serve the app in `mode` ("wsgi" or "asgi")."""
+    if mode == "wsgi":
+        return [
+            sys.executable, "-m", "gunicorn", "application:application",
+            "--bind", f"127.0.0.1:{port}", "--workers", "1", "--threads", str(threads),
+        ]  # fmt: skip
+    return [
+        sys.executable, "-m", "uvicorn", "asgi:app",
+        "--port", str(port), "--workers", "1", "--log-level", "warning",
+    ]  # fmt: skip
+
+
+def run(mode, upstream, args):
+    """Start the app in `mode`, load it and return the stats."""
+    port = free_port()
+    env = dict(
+        os.environ,
+        TALLY_DATA_URL=f"{upstream}/test.csv",
+        TALLY_DATA_ZONES_URL=f"{upstream}/test-areas.csv",
+        DASH_CACHE_EXPIRE=str(args.expire),
+        DASH_LOG_LEVEL="warning",
+        ASGI_THREADS=str(args.threads),
+    )
+    env.pop("FLASK_DEBUG", None)
+    server = subprocess.Popen(
+        server_command(mode, port, args.threads), cwd=repo_root, env=env
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        # Wait for the app, and for the first data load.
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                if requests.get(base + "/_dash-layout", timeout=30).ok:
+                    break
+            except requests.exceptions.ConnectionError:
+                pass
+            if time.monotonic() > deadline:
+                sys.exit(f"{mode} server didn't come up")
+            time.sleep(0.5)
+
+        latencies = []
+        errors = []
+        stop_at = time.monotonic() + args.duration
+
+        def client():
+            with requests.Session() as session:
+                while time.monotonic() < stop_at:
+                    started = time.monotonic()
+                    try:
+                        response = session.post(
+                            base + "/_dash-update-component",
+                            json=callback_body,
+                            timeout=60,
+                        )
+                        response.raise_for_status()
+                        latencies.append(time.monotonic() - started)
+                    except requests.exceptions.RequestException as e:
+                        errors.append(e)
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for _ in range(args.concurrency):
+                pool.submit(client)
+
+        latencies.sort()
+        count = len(latencies)
+        return dict(
+            requests=count,
+            errors=len(errors),
+            rps=count / args.duration,
+            p50=latencies[count // 2] if count else None,
+            p95=latencies[int(count * 0.95)] if count else None,
+            max=latencies[-1] if count else None,
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    """Run both serving modes and print a comparison."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=int, default=20, help="seconds per mode")
+    parser.add_argument("--threads", type=int, default=8, help="server threads")
+    parser.add_argument("--upstream-delay", type=float, default=3, help="seconds")
+    parser.add_argument("--expire", type=int, default=5, help="cache expiry, seconds")
+    parser.add_argument("--modes", nargs="+", default=["wsgi", "asgi"])
+    args = parser.parse_args()
+
+    upstream = start_upstream(args.upstream_delay)
+    results = {mode: run(mode, upstream, args) for mode in args.modes}
+
+    print(
+        f"{'mode':6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}"
+        f" {'max ms':>8} {'errors':>7}"
+    )
+    for mode, r in results.items():
+        if not r["requests"]:
+            print(f"{mode:6} no successful requests ({r['errors']} errors)")
+            continue
+        print(
+            f"{mode:6} {r['rps']:8.1f} {r['p50'] * 1000:8.0f} {r['p95'] * 1000:8.0f}"
+            f" {r['max'] * 1000:8.0f} {r['errors']:7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,26 @@
 
 Perform data pre-processing for the web app.
 
+Each upstream dataset is registered in `sources` with its own schema,
+preprocessing hook, cache partition and refresh interval, so a slow or
+failing feed only affects the charts that use it.
+
 """
 
-# pylint: disable=C0103,C0301,E0401
+# pylint: disable=C0103,C0301,C0415,E0401
 
 import os
 import ssl
+import time
+import threading
 import traceback
 import logging
-import requests
+import hashlib
 from io import StringIO
 from datetime import datetime
-import numpy as np
-import pandas as pd
 from beaker.cache import CacheManager
 from beaker.util import parse_cache_config_options
+import snapshots
 
 DASH_LOG_LEVEL = os.getenv("DASH_LOG_LEVEL", default="info")
 logging.basicConfig(level=getattr(logging, DASH_LOG_LEVEL.upper(), logging.INFO))
@@ -26,7 +31,15 @@ CACHE_EXPIRE = int(os.getenv("DASH_CACHE_EXPIRE", default="43200"))
 logging.info("Cache expire set to %s seconds", CACHE_EXPIRE)
 cache_opts = {"cache.type": "memory"}
 cache = CacheManager(**parse_cache_config_options(cache_opts))
-data_cache = cache.get_cache("api_data", type="memory", expire=CACHE_EXPIRE)
+
+# Make the response look like a browser to avoid 403 errors from CloudFlare
+headers = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36"
+}
+
+# After a failed fetch, wait this long (seconds) before trying
+# that source again, serving the last good copy meanwhile.
+RETRY_AFTER = int(os.getenv("DASH_RETRY_AFTER", default="300"))
 
 
 # Bypass SSL certification check for the AICC server
@@ -68,6 +81,7 @@ def collapse_year(date):
     with all the same year.  This lets us
     give Plotly the x-axis as a date.
     """
+    import numpy as np
 
     try:
         d = datetime.strptime(str(date), "%Y%m%d")
@@ -86,6 +100,8 @@ def preprocess_data(csv):
     mostly the same regardless of if it's
     coming from the statewide or aggregate data.
     """
+    import pandas as pd
+
     df = csv
     df = df.loc[(df["FireSeason"] >= 2004)]
     df = df.assign(
@@ -102,74 +118,252 @@ def preprocess_data(csv):
     return df
 
 
-def fetch_api_data():
+# Registry of upstream datasets, see register_source.
+sources = {}
+
+# Per-source state.
+source_caches = {}  # beaker cache partition for each source
+source_versions = {}  # hash of the last downloaded CSV
+source_stats = {}  # rows, memory use, fetch duration
+last_good = {}  # last successfully fetched frame
+failed_at = {}  # time of the last failed fetch
+refreshing = set()  # sources being refreshed in the background
+refreshing_lock = threading.Lock()
+
+# False once something else (asgi.py) owns the refresh schedule.
+expiry_enabled = True
+
+
+def register_source(
+    name,
+    url,
+    drop_columns=(),
+    dtype=None,
+    preprocess=preprocess_data,
+    keys=None,
+    expire=CACHE_EXPIRE,
+):
     """
-    Fetch data from API (or local dev CSV),
-    then do some initial sculpting and pass
-    to preprocessing.
+    Add an upstream dataset.
+    `drop_columns` and `dtype` are the schema applied when reading the CSV,
+    `preprocess` turns the raw frame into what the charts use,
+    `keys` are the columns uniquely identifying a row (for snapshots;
+    the upstream ID, since dates repeat in the AICC data) and
+    `expire` is how long (seconds) to cache it before refreshing, which
+    can be overridden with the DASH_CACHE_EXPIRE_<NAME> env var.
     """
-    logging.info("Updating data from upstream API...")
-    try:
-        # Make the response look like a browser to avoid 403 errors from CloudFlare
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36"
-        }
-
-        response = requests.get(TALLY_DATA_URL, headers=headers, timeout=10)
-        response.raise_for_status()
-        tally_raw = pd.read_csv(StringIO(response.text), parse_dates=True)
-
-        tally_raw = tally_raw.drop(
-            columns=[
-                "ID",
-                "Month",
-                "Day",
-                "TotalFires",
-                "HumanFires",
-                "HumanAcres",
-                "LightningFires",
-                "LightningAcres",
-                "PrepLevel",
-            ]
-        )
-        tally = preprocess_data(tally_raw)
+    expire = int(os.getenv("DASH_CACHE_EXPIRE_" + name.upper(), default=expire))
+    sources[name] = dict(
+        url=url,
+        drop_columns=list(drop_columns),
+        dtype=dtype,
+        preprocess=preprocess,
+        keys=keys,
+        expire=expire,
+    )
+    source_caches[name] = cache.get_cache(
+        "source_" + name, type="memory", expire=expire if expiry_enabled else None
+    )
+    if keys:
+        snapshots.keys[name] = keys
 
-        response = requests.get(TALLY_DATA_ZONES_URL, headers=headers, timeout=10)
-        response.raise_for_status()
-        tally_zone_raw = pd.read_csv(
-            StringIO(response.text),
-            dtype={"FireSeason": "Int64", "SitReportDate": "Int64"},
-        )
 
-        tally_zone_raw = tally_zone_raw.drop(
-            columns=[
-                "ID",
-                "Month",
-                "Day",
-                "NewFires",
-                "OutFires",
-                "ActiveFires",
-                "TotalFires",
-            ]
+def disable_expiry():
+    """
+    Keep cached sources until they're replaced, for when a background
+    task refreshes each source on its schedule (see asgi.py).  Requests
+    then only fetch synchronously before a source's first load.
+    """
+    global expiry_enabled  # pylint: disable=W0603
+    expiry_enabled = False
+    for name in sources:
+        source_caches[name] = cache.get_cache(
+            "source_" + name, type="memory", expire=None
         )
-        tally_zone = preprocess_data(tally_zone_raw)
 
-        # Compute what years are available in the tally zone file.
-        tally_zone_date_ranges = sorted(tally_zone.FireSeason.unique())
-        logging.info("...data updated successfully.")
-        return (tally, tally_zone, tally_zone_date_ranges)
+
+register_source(
+    "tally",
+    TALLY_DATA_URL,
+    drop_columns=[
+        "Month",
+        "Day",
+        "TotalFires",
+        "HumanFires",
+        "HumanAcres",
+        "LightningFires",
+        "LightningAcres",
+        "PrepLevel",
+    ],
+    keys=["ID"],
+)
+register_source(
+    "tally_zone",
+    TALLY_DATA_ZONES_URL,
+    drop_columns=[
+        "Month",
+        "Day",
+        "NewFires",
+        "OutFires",
+        "ActiveFires",
+        "TotalFires",
+    ],
+    dtype={"FireSeason": "Int64", "SitReportDate": "Int64"},
+    keys=["ID"],
+)
+
+
+def load_source(name, text, started=None):
+    """
+    Apply a source's schema and preprocessing to a downloaded CSV,
+    record a snapshot if the content changed and update its stats.
+    This is the CPU-bound half of a refresh, shared by the sync
+    fetch below and the async refresh in asgi.py.  If the download
+    is identical to the last one, the frame already loaded is reused.
+
+    pandas is imported here rather than at module level so that
+    importing the app stays fast; see bench/import_time.py.
+    """
+    import pandas as pd
+
+    source = sources[name]
+    started = started or time.monotonic()
+
+    # Only bump the version when upstream content actually changed.
+    version = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    if name in last_good and version == source_versions.get(name):
+        source_stats[name]["fetched_at"] = datetime.now()
+        logging.info("...%s unchanged upstream", name)
+        failed_at.pop(name, None)
+        return last_good[name]
+
+    raw = pd.read_csv(StringIO(text), dtype=source["dtype"])
+    raw = raw.drop(columns=source["drop_columns"])
+    df = source["preprocess"](raw)
+
+    # Snapshots are an optional history; the live charts mustn't depend on them.
+    if source["keys"]:
+        try:
+            snapshots.store.record({name: df})
+        except Exception:
+            logging.error("Snapshot of %s not recorded", name)
+            logging.error(traceback.format_exc())
+
+    # Publish the version together with its frame and stats, only once
+    # everything above has succeeded, so a version never labels a stale frame.
+    stats = dict(
+        rows=len(df),
+        bytes=int(df.memory_usage(deep=True).sum()),
+        seconds=round(time.monotonic() - started, 2),
+        fetched_at=datetime.now(),
+    )
+    last_good[name] = df
+    source_stats[name] = stats
+    source_versions[name] = version
+    failed_at.pop(name, None)
+
+    total_bytes = sum(stats["bytes"] for stats in source_stats.values())
+    logging.info(
+        "...%s updated: %s rows, %.1f MB (all sources %.1f MB) in %ss",
+        name,
+        source_stats[name]["rows"],
+        source_stats[name]["bytes"] / 1e6,
+        total_bytes / 1e6,
+        source_stats[name]["seconds"],
+    )
+    return df
+
+
+def fetch_source_data(name):
+    """
+    Fetch one source from upstream (or local dev CSV) and load it.
+    Raises on failure, so nothing gets cached.
+    """
+    import requests
+
+    logging.info("Updating %s from upstream API...", name)
+    started = time.monotonic()
+    response = requests.get(sources[name]["url"], headers=headers, timeout=10)
+    response.raise_for_status()
+    return load_source(name, response.text, started)
+
+
+def fetch_source(name, as_of=None):
+    """
+    Check the source's cache partition & fetch from upstream if not present.
+    If the fetch fails, the last good copy (or None) is returned and the
+    source isn't retried for RETRY_AFTER seconds, so a failing feed
+    doesn't hold up every request that touches it.
+    If `as_of` (a date) is given, return the data as it looked
+    then, from the snapshot store.
+    """
+    import requests
+
+    if as_of is not None:
+        snapshot = snapshots.store.as_of(name, as_of)
+        if snapshot is not None:
+            return snapshot
+        logging.warning("No %s snapshot as of %s, using current data", name, as_of)
+
+    if name in failed_at and time.monotonic() - failed_at[name] < RETRY_AFTER:
+        return last_good.get(name)
+
+    try:
+        return source_caches[name].get(
+            key=name, createfunc=lambda: fetch_source_data(name)
+        )
 
     # Recommended exception handling for requests
     except requests.exceptions.HTTPError as http_err:
-        logging.error(f"HTTP Error: {http_err}")
+        logging.error(f"HTTP Error fetching {name}: {http_err}")
     except requests.exceptions.RequestException as req_err:
-        logging.error(f"Request Error: {req_err}")
-    except Exception as e:
+        logging.error(f"Request Error fetching {name}: {req_err}")
+    except Exception:
         logging.error(traceback.format_exc())
 
-    return None
+    failed_at[name] = time.monotonic()
+    return last_good.get(name)
+
+
+def refresh_in_background(name):
+    """Thread target for refresh_stale_sources."""
+    try:
+        fetch_source(name)
+    finally:
+        with refreshing_lock:
+            refreshing.discard(name)
 
 
-def fetch_data():
-    """Check cache for data & fetch from API if not present"""
-    return data_cache.get(key="api_data", createfunc=fetch_api_data)
+def refresh_stale_sources():
+    """
+    Start a background refresh of each source that has never loaded or
+    whose copy is older than its expiry, without waiting for it.  This
+    lets open dashboards notice new data even when no chart callback
+    has touched that source's cache.
+    """
+    if not expiry_enabled:
+        return
+    now = datetime.now()
+    for name, source in sources.items():
+        stats = source_stats.get(name)
+        if stats and (now - stats["fetched_at"]).total_seconds() < source["expire"]:
+            continue
+        with refreshing_lock:
+            if name in refreshing:
+                continue
+            refreshing.add(name)
+        threading.Thread(
+            target=refresh_in_background, args=(name,), daemon=True
+        ).start()
+
+
+def get_source_versions():
+    """
+    Return each source's version (hash of its last download), as
+    recorded when it was loaded, so this never waits on a download.
+    Stale sources are refreshed in the background and their new
+    version shows up in a later call.  Open dashboards poll this and
+    redraw only the charts whose source changed.
+    """
+    refresh_stale_sources()
+    return dict(source_versions)
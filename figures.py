@@ -0,0 +1,206 @@
+# pylint: disable=C0103,C0301
+"""
+Chart figures, shared by the callbacks and the initial page layout.
+"""
+
+from datetime import datetime
+import luts
+
+
+def get_title_date_span(day_range):
+    """Helper to build the string fragment stating time span in titles."""
+    return str(
+        datetime.strptime(str(day_range[0]), "%j").strftime("%B %-d")
+        + "—"
+        + datetime.strptime(str(day_range[1]), "%j").strftime("%B %-d")
+    )
+
+
+# Some reused configs in charts go here to reduce duplication.
+yaxis_conf = dict(
+    title="Area burned (acres)",
+    fixedrange=True,
+)
+xaxis_conf = dict(
+    tickformat="%B %-d",
+    fixedrange=True,
+)
+hover_conf = "%{y:,} acres"  # hover format (D3 language)
+
+# Dummy trace with legend entry for non-big years
+other_years_trace = {
+    "x": [None],
+    "y": [None],
+    "mode": "lines",
+    "name": "Other years",
+    "line": {
+        "color": luts.default_style["color"],
+        "width": luts.default_style["width"],
+    },
+}
+
+
+def slice_day_range(df, day_range):
+    """Slice data to the selected day-of-year range."""
+    return df.loc[(df.doy >= day_range[0]) & (df.doy <= day_range[1])]
+
+
+def get_tally_figure(tally, day_range):
+    """Generate daily tally count"""
+    data_traces = []
+
+    #  Slice by day range.
+    sliced = slice_day_range(tally, day_range)
+
+    grouped = sliced.groupby("FireSeason")
+    for name, group in grouped:
+        group = group.sort_values(["date_stacked"])
+
+        if name in luts.important_years:
+            hovertemplate = hover_conf
+            hoverinfo = ""
+            showlegend = True
+        else:
+            hovertemplate = None
+            hoverinfo = "skip"
+            showlegend = False
+
+        data_traces.extend(
+            [
+                {
+                    "x": group.date_stacked,
+                    "y": round(group.TotalAcres),
+                    "mode": "lines",
+                    "name": str(name),
+                    "line": {
+                        "color": luts.years_lines_styles[str(name)]["color"],
+                        "width": luts.years_lines_styles[str(name)]["width"],
+                    },
+                    "showlegend": showlegend,
+                    "hoverinfo": hoverinfo,
+                    "hovertemplate": hovertemplate,
+                }
+            ]
+        )
+
+    data_traces.extend([other_years_trace])
+
+    graph_layout = dict(
+        title=dict(
+            text="<b>Alaska Statewide Daily Tally Records, 2004-Present,</b><br>"
+            + get_title_date_span(day_range)
+        ),
+        xaxis=xaxis_conf,
+        yaxis=yaxis_conf,
+        hovermode="x unified",
+        hoverdistance=1,
+    )
+    return {"data": data_traces, "layout": graph_layout}
+
+
+def get_tally_zone_figure(tally_zone, area, day_range):
+    """Generate daily tally count for specified protection area"""
+
+    #  Slice by day range.
+    sliced = slice_day_range(tally_zone, day_range)
+
+    # Spatial clip
+    de = sliced.loc[(sliced["ProtectionUnit"] == area)]
+
+    data_traces = []
+    grouped = de.groupby("FireSeason")
+    for name, group in grouped:
+        group = group.sort_values(["date_stacked"])
+        group["TotalAcres"] = group["TotalAcres"].round(2)
+        data_traces.extend(
+            [
+                {
+                    "x": group.date_stacked,
+                    "y": round(group.TotalAcres),
+                    "mode": "lines",
+                    "name": name,
+                    "line": {
+                        "color": luts.years_lines_styles[str(name)]["color"],
+                        "width": luts.years_lines_styles[str(name)]["width"],
+                    },
+                    "hovertemplate": hover_conf,
+                }
+            ]
+        )
+
+    data_traces.extend([other_years_trace])
+
+    graph_layout = dict(
+        title=dict(
+            text="<b>Alaska Daily Tally Records, "
+            + luts.zones[area]
+            + ", 2004-Present</b><br>"
+            + get_title_date_span(day_range)
+        ),
+        xaxis=xaxis_conf,
+        yaxis=yaxis_conf,
+        hovermode="x unified",
+        hoverdistance=1,
+    )
+    return {"data": data_traces, "layout": graph_layout}
+
+
+def get_year_zone_figure(tally_zone, year, day_range):
+    """Generate daily tally count by area/year"""
+
+    # Clip to day range
+    sliced = slice_day_range(tally_zone, day_range)
+
+    # Subset by selected year.
+    de = sliced.loc[(sliced.FireSeason == year)]
+
+    data_traces = []
+    grouped = de.groupby("ProtectionUnit")
+    for name, group in grouped:
+        group = group.sort_values(["date_stacked"])
+        group["TotalAcres"] = group["TotalAcres"].round(2)
+        data_traces.extend(
+            [
+                {
+                    "x": group.date_stacked,
+                    "y": round(group.TotalAcres),
+                    "mode": "lines",
+                    "name": luts.zones[name],
+                    "line": {"width": 2},
+                    "hovertemplate": hover_conf,
+                }
+            ]
+        )
+
+    graph_layout = dict(
+        title=dict(
+            text="<b>Alaska Daily Tally Records by Year, "
+            + str(year)
+            + "</b><br>"
+            + get_title_date_span(day_range)
+        ),
+        xaxis=xaxis_conf,
+        yaxis=yaxis_conf,
+        hovermode="x unified",
+        hoverdistance=1,
+    )
+    return {"data": data_traces, "layout": graph_layout}
+
+
+def get_initial_figures(tally, tally_zone):
+    """
+    Build all three charts with their default selections, from one read
+    of the data.  Sources that failed to load get an empty chart.
+    """
+    day_range = luts.default_date_range
+    figures = {key: {} for key in ["tally", "tally-zone", "tally-year"]}
+    if tally is not None:
+        figures["tally"] = get_tally_figure(tally, day_range)
+    if tally_zone is not None:
+        figures["tally-zone"] = get_tally_zone_figure(
+            tally_zone, luts.default_area, day_range
+        )
+        figures["tally-year"] = get_year_zone_figure(
+            tally_zone, luts.default_year, day_range
+        )
+    return figures
@@ -4,18 +4,22 @@ GUI for app
 """
 
 import os
-from datetime import datetime
+from datetime import date, datetime
+import flask
 from dash import dcc
 from dash import html
 import dash_dangerously_set_inner_html as ddsih
 import luts
 import data
-
-(tally, tally_zone, tally_zone_date_ranges) = data.fetch_data()
+import figures
+import snapshots
 
 # For hosting
 path_prefix = os.getenv("DASH_REQUESTS_PATHNAME_PREFIX") or "/"
 
+# How often (seconds) open pages check whether the data has been updated.
+DATA_POLL_INTERVAL = int(os.getenv("DASH_DATA_POLL_INTERVAL", default="300"))
+
 # Used to make the chart exports nice
 fig_download_configs = dict(
     filename="Daily_Tally_Count", width="1000", height="650", scale=2
@@ -140,22 +144,54 @@ about = wrap_in_section(
 )
 
 
+def get_as_of_field(first_date):
+    """
+    Optional date picker to show the charts as they looked on a past
+    date.  Built per page so it covers the snapshots recorded so far,
+    from `first_date` on.
+    """
+    as_of_picker = dcc.DatePickerSingle(
+        id="as_of",
+        clearable=True,
+        placeholder="Latest data",
+        display_format="MMMM D, YYYY",
+        min_date_allowed=first_date,
+        max_date_allowed=date.today(),
+    )
+    return wrap_in_section(
+        [
+            html.Div(
+                className="field",
+                children=[
+                    html.Label("Show data as of (optional)", className="label"),
+                    html.Div(className="control", children=[as_of_picker]),
+                ],
+            )
+        ]
+    )
+
+
 # Daily Tally, statewide only
 range_slider_field = get_day_range_slider("day_range")
-tally_graph = wrap_in_section(
-    [
-        html.H3("Statewide daily tally", className="title is-4"),
-        html.P(
-            """
+
+
+def get_tally_graph(figure):
+    """Build the statewide section, with the chart's initial figure."""
+    return wrap_in_section(
+        [
+            html.H3("Statewide daily tally", className="title is-4"),
+            html.P(
+                """
 Daily tallies go up or down as improved estimates and data become available throughout the fire season.
-    """,
-            className="content is-size-5",
-        ),
-        dcc.Graph(id="tally", config=fig_configs),
-        range_slider_field,
-    ],
-    section_classes="graph",
-)
+        """,
+                className="content is-size-5",
+            ),
+            dcc.Graph(id="tally", figure=figure, config=fig_configs),
+            range_slider_field,
+        ],
+        section_classes="graph",
+    )
+
 
 # Daily Tally by Protection Zone
 range_slider_field_zone = get_day_range_slider("day_range_zone")
@@ -163,7 +199,7 @@ zone_dropdown = dcc.Dropdown(
     id="area",
     className="dropdown-selector",
     options=[{"label": luts.zones[key], "value": key} for key in luts.zones],
-    value="CGF",
+    value=luts.default_area,
 )
 zone_dropdown_field = html.Div(
     className="field",
@@ -172,56 +208,80 @@ zone_dropdown_field = html.Div(
         html.Div(className="control", children=[zone_dropdown]),
     ],
 )
-tally_zone_graph = wrap_in_section(
-    [
-        html.H3("Daily tally by protection area", className="title is-4"),
-        ddsih.DangerouslySetInnerHTML(
-            """
+zone_description = ddsih.DangerouslySetInnerHTML(
+    """
 <p class="content is-size-5">This chart shows the daily tally for one protection area (<a href="https://fire.ak.blm.gov/content/maps/aicc/Large%20Maps/Alaska_Fire_Management_Zones.pdf">see this map of wildland fire protection areas</a> to see which areas cover which parts of the state).  These data are still being updated and not all years may be present yet.</p><br>
-        """
-        ),
-        zone_dropdown_field,
-        html.Div(
-            className="graph", children=[dcc.Graph(id="tally-zone", config=fig_configs)]
-        ),
-        range_slider_field_zone,
-    ],
-    section_classes="graph",
+"""
 )
 
 
+def get_tally_zone_graph(figure):
+    """Build the protection area section, with the chart's initial figure."""
+    return wrap_in_section(
+        [
+            html.H3("Daily tally by protection area", className="title is-4"),
+            zone_description,
+            zone_dropdown_field,
+            html.Div(
+                className="graph",
+                children=[
+                    dcc.Graph(id="tally-zone", figure=figure, config=fig_configs)
+                ],
+            ),
+            range_slider_field_zone,
+        ],
+        section_classes="graph",
+    )
+
+
 # Daily Tally by Year/Protection Zone
 range_slider_field_year = get_day_range_slider("day_range_year")
-year_dropdown = dcc.Dropdown(
-    id="year",
-    className="dropdown-selector",
-    options=[{"label": year, "value": year} for year in tally_zone_date_ranges],
-    value=2004,
-)
-year_dropdown_field = html.Div(
-    className="field",
-    children=[
-        html.Label("Select a year", className="label"),
-        html.Div(className="control", children=[year_dropdown]),
-    ],
-)
-year_zone_graph = wrap_in_section(
-    [
-        html.H3("Daily tally by year", className="title is-4"),
-        html.P(
-            """
+
+
+def get_year_zone_graph(tally_zone, figure):
+    """
+    Build the by-year section, with the chart's initial figure.
+    The year dropdown options depend on which years are in the
+    zone data, so this is built per page.
+    """
+    if tally_zone is not None:
+        tally_zone_date_ranges = sorted(tally_zone.FireSeason.unique())
+    else:
+        tally_zone_date_ranges = []
+    year_dropdown = dcc.Dropdown(
+        id="year",
+        className="dropdown-selector",
+        options=[{"label": year, "value": year} for year in tally_zone_date_ranges],
+        value=luts.default_year,
+    )
+    year_dropdown_field = html.Div(
+        className="field",
+        children=[
+            html.Label("Select a year", className="label"),
+            html.Div(className="control", children=[year_dropdown]),
+        ],
+    )
+    return wrap_in_section(
+        [
+            html.H3("Daily tally by year", className="title is-4"),
+            html.P(
+                """
 This chart shows the daily tally for each protection area for a given year.  These data are still being updated and not all years may be present yet.
-        """,
-            className="content is-size-5",
-        ),
-        year_dropdown_field,
-        html.Div(
-            className="graph", children=[dcc.Graph(id="tally-year", config=fig_configs)]
-        ),
-        range_slider_field_year,
-    ],
-    section_classes="graph",
-)
+            """,
+                className="content is-size-5",
+            ),
+            year_dropdown_field,
+            html.Div(
+                className="graph",
+                children=[
+                    dcc.Graph(id="tally-year", figure=figure, config=fig_configs)
+                ],
+            ),
+            range_slider_field_year,
+        ],
+        section_classes="graph",
+    )
+
 
 # Used in copyright date
 current_year = datetime.now().year
@@ -256,10 +316,46 @@ footer = html.Footer(
     ],
 )
 
-layout = html.Div(
-    children=[
-        header,
-        html.Div(children=[about, tally_graph, tally_zone_graph, year_zone_graph]),
-        footer,
-    ]
-)
+
+def layout():
+    """
+    Dash calls this on each page load, so data-dependent parts of
+    the layout are built on demand rather than when the app starts.
+    """
+    # Dash also calls layout() once when it's assigned to app.layout,
+    # to validate callback IDs.  No data is needed for that, so only
+    # fetch it when serving a request.
+    if flask.has_request_context():
+        tally = data.fetch_source("tally")
+        tally_zone = data.fetch_source("tally_zone")
+        versions = data.get_source_versions()
+        first_date = snapshots.store.first_date()
+    else:
+        versions = {}
+        tally = tally_zone = first_date = None
+
+    # The charts' default figures are sent with the layout, built from
+    # this one read of the data, instead of each chart making its own
+    # callback request once the page has loaded.
+    initial_figures = figures.get_initial_figures(tally, tally_zone)
+
+    return html.Div(
+        children=[
+            # One version per source, so that new data only
+            # redraws the charts drawn from that source.
+            dcc.Store(id="tally-version", data=versions.get("tally")),
+            dcc.Store(id="tally_zone-version", data=versions.get("tally_zone")),
+            dcc.Interval(id="data-poll", interval=DATA_POLL_INTERVAL * 1000),
+            header,
+            html.Div(
+                children=[
+                    about,
+                    get_as_of_field(first_date),
+                    get_tally_graph(initial_figures["tally"]),
+                    get_tally_zone_graph(initial_figures["tally-zone"]),
+                    get_year_zone_graph(tally_zone, initial_figures["tally-year"]),
+                ]
+            ),
+            footer,
+        ]
+    )
@@ -17,6 +17,8 @@ def get_doy(month, day):
 
 
 default_date_range = [get_doy(4, 1), get_doy(9, 16)]
+default_area = "CGF"
+default_year = 2004
 
 default_style = {"color": "rgba(0, 0, 0, 0.25)", "width": 1}
 
@@ -0,0 +1,269 @@
+"""
+
+Versioned snapshots of the preprocessed data, so charts can be
+reproduced as they looked on a past date.
+
+AICC revises past rows, so each successful fetch is recorded as a
+version keyed by its fetch time.  Only rows that are new or changed
+since the previous version are stored, along with tombstones for rows
+that disappeared; the data as of any version is rebuilt by replaying
+the deltas up to it.  Storage grows with the daily changes rather than
+with full copies of the data.
+
+"""
+
+# pylint: disable=C0103,C0301,C0415
+
+import os
+import bisect
+import logging
+import threading
+from datetime import date, datetime, time
+
+# If set, deltas are also written here and reloaded on startup.
+# Otherwise snapshots only live as long as the process.
+SNAPSHOT_DIR = os.getenv("DASH_SNAPSHOT_DIR")
+
+# Columns identifying a row in each dataset, filled in
+# from the source registry by data.register_source.  They must be
+# unique within a frame (e.g. the upstream ID); rows are replayed
+# by key, so duplicate keys would collapse into one row.
+keys = {}
+
+VERSION_FORMAT = "%Y%m%dT%H%M%S"
+
+# How many rebuilt as-of frames to keep around.
+MATERIALIZED_LIMIT = 8
+
+
+class SnapshotStore:
+    """
+    Append-only store of per-version deltas for each dataset.
+    Versions are fetch timestamps, kept sorted so "what did it
+    look like on day D" is a binary search.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.versions = []  # sorted fetch timestamps
+        self.deltas = {}  # name -> [(version, delta)]
+        self.latest = {}  # name -> current full frame, for diffing
+        self.materialized = {}  # (name, version) -> frame
+        self.lock = threading.Lock()
+        self.loaded = False
+
+    def ensure_loaded(self):
+        """
+        Reload deltas from `path` on first use rather than at import,
+        which would mean importing pandas and unpickling the whole
+        history before the app can start.  Call with the lock held.
+        """
+        if not self.loaded:
+            self.loaded = True
+            if self.path:
+                self.load()
+
+    def add_version(self, version):
+        """Index a new version timestamp."""
+        if version not in self.versions:
+            bisect.insort(self.versions, version)
+
+    def record(self, frames, fetched_at=None):
+        """
+        Record a freshly fetched set of frames, e.g.
+        {"tally": tally, "tally_zone": tally_zone}.
+        Nothing is stored if no rows changed.  Frames whose
+        keys aren't unique are logged and skipped.
+        """
+        import pandas as pd
+
+        version = (fetched_at or datetime.now()).replace(microsecond=0)
+        with self.lock:
+            self.ensure_loaded()
+            changed = {}
+            for name, df in frames.items():
+                if df.duplicated(subset=keys[name]).any():
+                    logging.error(
+                        "Duplicate %s keys %s, snapshot not recorded",
+                        name,
+                        keys[name],
+                    )
+                    continue
+                delta = self.diff(name, df)
+                if len(delta):
+                    changed[name] = delta
+                self.latest[name] = df
+
+            if not changed:
+                logging.info("No changed rows, snapshot not recorded.")
+                return None
+
+            for name, delta in changed.items():
+                delta = delta.assign(_version=pd.Timestamp(version))
+                self.deltas.setdefault(name, []).append((version, delta))
+                if self.path:
+                    self.save(name, version, delta)
+            self.add_version(version)
+            summary = ", ".join(
+                f"{name}: {len(delta)} rows" for name, delta in changed.items()
+            )
+            logging.info(
+                "Recorded snapshot %s (%s)", version.strftime(VERSION_FORMAT), summary
+            )
+            return version
+
+    def diff(self, name, df):
+        """
+        Rows of `df` that are new or changed since the latest version,
+        plus tombstone rows (`_deleted`) for keys that went away.
+        """
+        import pandas as pd
+
+        previous = self.latest.get(name)
+        if previous is None:
+            previous = self.rebuild(name, self.versions[-1]) if self.versions else None
+        if previous is None:
+            return df.assign(_deleted=False)
+
+        row_hashes = pd.util.hash_pandas_object(df, index=False)
+        previous_hashes = pd.util.hash_pandas_object(previous, index=False)
+        changed = df.loc[~row_hashes.isin(previous_hashes).to_numpy()]
+
+        key_cols = keys[name]
+        key_hashes = pd.util.hash_pandas_object(df[key_cols], index=False)
+        previous_key_hashes = pd.util.hash_pandas_object(
+            previous[key_cols], index=False
+        )
+        removed = previous.loc[
+            ~previous_key_hashes.isin(key_hashes).to_numpy(), key_cols
+        ]
+
+        return pd.concat(
+            [changed.assign(_deleted=False), removed.assign(_deleted=True)],
+            ignore_index=True,
+        )
+
+    def rebuild(self, name, version):
+        """Replay deltas for `name` up to and including `version`."""
+        import pandas as pd
+
+        cache_key = (name, version)
+        if cache_key in self.materialized:
+            return self.materialized[cache_key]
+
+        deltas = [delta for (v, delta) in self.deltas.get(name, []) if v <= version]
+        if not deltas:
+            return None
+        df = pd.concat(deltas, ignore_index=True)
+        df = df.sort_values("_version", kind="stable")
+        df = df.drop_duplicates(subset=keys[name], keep="last")
+        df = df.loc[~df["_deleted"].astype(bool)]
+        df = df.drop(columns=["_version", "_deleted"])
+
+        # Tombstones have no values outside the key columns, which upcasts
+        # ints to floats in the concat above; put the original types back.
+        dtypes = deltas[0].dtypes
+        df = df.astype({col: dtypes[col] for col in df.columns if col in dtypes})
+        df = df.sort_values(keys[name]).reset_index(drop=True)
+
+        if len(self.materialized) >= MATERIALIZED_LIMIT:
+            self.materialized.clear()
+        self.materialized[cache_key] = df
+        return df
+
+    def version_as_of(self, when):
+        """
+        Latest version recorded at or before `when`, which can be
+        a datetime, a date (meaning the end of that day) or an
+        ISO date string as sent by dcc.DatePickerSingle.
+        """
+        if isinstance(when, str):
+            when = date.fromisoformat(when[:10])
+        if not isinstance(when, datetime):
+            when = datetime.combine(when, time.max)
+
+        index = bisect.bisect_right(self.versions, when)
+        return self.versions[index - 1] if index else None
+
+    def as_of(self, name, when):
+        """The `name` dataset as it looked at `when`, or None if no version exists."""
+        with self.lock:
+            self.ensure_loaded()
+            version = self.version_as_of(when)
+            if version is None:
+                return None
+            return self.rebuild(name, version)
+
+    def first_date(self):
+        """Date of the earliest recorded version, or None."""
+        with self.lock:
+            self.ensure_loaded()
+            return self.versions[0].date() if self.versions else None
+
+    def save(self, name, version, delta):
+        """
+        Write one delta to disk.  It's written to a temporary file
+        and renamed into place, so a crash never leaves a partial delta.
+        """
+        directory = os.path.join(self.path, name)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, version.strftime(VERSION_FORMAT) + ".pkl.gz")
+        delta.to_pickle(path + ".tmp", compression="gzip")
+        os.replace(path + ".tmp", path)
+
+    def load(self):
+        """
+        Reload deltas previously written to `path`.  Replaying past a
+        missing delta would give wrong as-of frames, so if one can't be
+        read, it and the later deltas of that dataset are skipped and
+        set aside (renamed to *.skipped) so new deltas follow on from
+        what was loaded.
+        """
+        import pandas as pd
+
+        if not os.path.isdir(self.path):
+            return
+        for name in sorted(os.listdir(self.path)):
+            directory = os.path.join(self.path, name)
+            if not os.path.isdir(directory):
+                continue
+            filenames = sorted(
+                filename
+                for filename in os.listdir(directory)
+                if filename.endswith(".pkl.gz")
+            )
+            for index, filename in enumerate(filenames):
+                try:
+                    version = datetime.strptime(
+                        filename[: -len(".pkl.gz")], VERSION_FORMAT
+                    )
+                    delta = pd.read_pickle(os.path.join(directory, filename))
+                except Exception as e:
+                    logging.error(
+                        "Unreadable snapshot %s/%s (%s), skipping it and %s later %s versions",
+                        name,
+                        filename,
+                        e,
+                        len(filenames) - index - 1,
+                        name,
+                    )
+                    self.set_aside(directory, filenames[index:])
+                    break
+                self.deltas.setdefault(name, []).append((version, delta))
+                self.add_version(version)
+        logging.info(
+            "Loaded %s snapshot versions from %s", len(self.versions), self.path
+        )
+
+    @staticmethod
+    def set_aside(directory, filenames):
+        """Rename skipped deltas so later loads ignore them."""
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            try:
+                os.replace(path, path + ".skipped")
+            except OSError as e:
+                logging.error("Couldn't set aside snapshot %s: %s", path, e)
+
+
+store = SnapshotStore(SNAPSHOT_DIR)
@@ -0,0 +1,61 @@
+"""
+Tests for loading downloaded sources.
+"""
+
+# pylint: disable=C0103,C0116,E0401,W0621
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data  # pylint: disable=C0413
+import snapshots  # pylint: disable=C0413
+
+header = "ID,FireSeason,SitReportDate,TotalAcres,Month,Day,TotalFires,HumanFires,HumanAcres,LightningFires,LightningAcres,PrepLevel\n"
+
+
+def make_csv(acres):
+    return header + f"1,2024,20240501,{acres},5,1,1,1,1,1,1,1\n"
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(snapshots, "store", snapshots.SnapshotStore())
+    for state in ("source_versions", "source_stats", "last_good", "failed_at"):
+        monkeypatch.setattr(data, state, {})
+
+
+def test_unchanged_download_reuses_frame():
+    first = data.load_source("tally", make_csv(1.2))
+    assert data.load_source("tally", make_csv(1.2)) is first
+
+
+def test_failed_load_does_not_publish_version(monkeypatch):
+    data.load_source("tally", make_csv(1.2))
+    version = data.source_versions["tally"]
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("bad data")
+
+    with monkeypatch.context() as m:
+        m.setitem(data.sources["tally"], "preprocess", fail)
+        with pytest.raises(RuntimeError):
+            data.load_source("tally", make_csv(3.4))
+    assert data.source_versions["tally"] == version
+
+    # Retrying the same download loads it rather than reusing the old frame.
+    df = data.load_source("tally", make_csv(3.4))
+    assert df.TotalAcres.tolist() == [3.4]
+
+
+def test_snapshot_failure_does_not_break_load(monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(snapshots.store, "record", fail)
+    df = data.load_source("tally", make_csv(1.2))
+    assert df.TotalAcres.tolist() == [1.2]
+    assert data.last_good["tally"] is df
+    assert "tally" in data.source_versions
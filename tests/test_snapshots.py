@@ -0,0 +1,147 @@
+"""
+Tests for the as-of snapshot store.
+"""
+
+# pylint: disable=C0103,C0116,E0401,W0621
+
+import os
+import sys
+from datetime import date, datetime
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import snapshots  # pylint: disable=C0413
+
+day1 = datetime(2026, 6, 1, 8)
+day2 = datetime(2026, 6, 2, 8)
+day3 = datetime(2026, 6, 3, 8)
+
+
+@pytest.fixture(autouse=True)
+def tally_keys(monkeypatch):
+    monkeypatch.setitem(snapshots.keys, "tally", ["ID"])
+
+
+def make_tally():
+    """Frame with two rows sharing FireSeason/date_stacked, as AICC has."""
+    return pd.DataFrame(
+        {
+            "ID": [1, 2, 3, 4],
+            "FireSeason": [2024, 2024, 2024, 2025],
+            "date_stacked": pd.to_datetime(
+                ["2024-05-01", "2024-05-01", "2024-05-02", "2024-05-01"]
+            ),
+            "TotalAcres": [1.5, 1.5, 2.0, 3.0],
+            "doy": [122, 122, 123, 122],
+        }
+    )
+
+
+def assert_same(left, right):
+    pd.testing.assert_frame_equal(
+        left.sort_values("ID").reset_index(drop=True),
+        right.sort_values("ID").reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_duplicate_dates_survive_rebuild():
+    store = snapshots.SnapshotStore()
+    tally = make_tally()
+    assert store.record({"tally": tally}, day1) == day1
+    assert_same(store.as_of("tally", date(2026, 6, 1)), tally)
+
+
+def test_revised_row_stores_only_the_delta():
+    store = snapshots.SnapshotStore()
+    before = make_tally()
+    store.record({"tally": before}, day1)
+
+    after = before.copy()
+    after.loc[after.ID == 3, "TotalAcres"] = 9.0
+    store.record({"tally": after}, day2)
+
+    assert len(store.deltas["tally"][-1][1]) == 1
+    assert_same(store.as_of("tally", "2026-06-01"), before)
+    assert_same(store.as_of("tally", "2026-06-02"), after)
+
+
+def test_removed_row_is_tombstoned():
+    store = snapshots.SnapshotStore()
+    before = make_tally()
+    store.record({"tally": before}, day1)
+
+    after = before.loc[before.ID != 2]
+    store.record({"tally": after}, day2)
+
+    delta = store.deltas["tally"][-1][1]
+    assert delta["_deleted"].tolist() == [True]
+    assert_same(store.as_of("tally", day2), after)
+    assert_same(store.as_of("tally", day1), before)
+
+
+def test_unchanged_data_is_not_recorded():
+    store = snapshots.SnapshotStore()
+    store.record({"tally": make_tally()}, day1)
+    assert store.record({"tally": make_tally()}, day2) is None
+    assert store.versions == [day1]
+
+
+def test_as_of_before_first_version():
+    store = snapshots.SnapshotStore()
+    store.record({"tally": make_tally()}, day2)
+    assert store.as_of("tally", day1) is None
+
+
+def test_duplicate_keys_are_not_recorded():
+    store = snapshots.SnapshotStore()
+    tally = make_tally()
+    tally.loc[1, "ID"] = 1
+    assert store.record({"tally": tally}, day1) is None
+    assert not store.versions
+
+
+def test_reload_from_disk(tmp_path):
+    store = snapshots.SnapshotStore(str(tmp_path))
+    before = make_tally()
+    store.record({"tally": before}, day1)
+    after = before.copy()
+    after.loc[after.ID == 4, "TotalAcres"] = 5.0
+    store.record({"tally": after}, day2)
+
+    reloaded = snapshots.SnapshotStore(str(tmp_path))
+    assert not reloaded.versions  # loaded on first use
+    assert reloaded.first_date() == day1.date()
+    assert reloaded.versions == [day1, day2]
+    assert_same(reloaded.as_of("tally", day1), before)
+    assert_same(reloaded.as_of("tally", day2), after)
+
+    # Unchanged upstream data after a restart records nothing new.
+    assert reloaded.record({"tally": after}, day3) is None
+    assert len(os.listdir(tmp_path / "tally")) == 2
+
+
+def test_unreadable_delta_skips_later_versions(tmp_path):
+    store = snapshots.SnapshotStore(str(tmp_path))
+    tally = make_tally()
+    store.record({"tally": tally}, day1)
+    for version, acres in [(day2, 5.0), (day3, 6.0)]:
+        tally = tally.copy()
+        tally.loc[tally.ID == 4, "TotalAcres"] = acres
+        store.record({"tally": tally}, version)
+
+    # Truncate the middle delta, as a crash mid-write would have.
+    broken = tmp_path / "tally" / (day2.strftime(snapshots.VERSION_FORMAT) + ".pkl.gz")
+    broken.write_bytes(broken.read_bytes()[:20])
+
+    reloaded = snapshots.SnapshotStore(str(tmp_path))
+    assert reloaded.first_date() == day1.date()
+    assert reloaded.versions == [day1]
+    assert_same(reloaded.as_of("tally", day3), make_tally())
+    assert sorted(os.listdir(tmp_path / "tally")) == [
+        day1.strftime(snapshots.VERSION_FORMAT) + ".pkl.gz",
+        day2.strftime(snapshots.VERSION_FORMAT) + ".pkl.gz.skipped",
+        day3.strftime(snapshots.VERSION_FORMAT) + ".pkl.gz.skipped",
+    ]